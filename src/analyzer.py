@@ -3,25 +3,51 @@ Analyzer module for analyzing code for complexity.
 """
 
 import csv
+import hashlib
 import os
+import time
 from rich.console import Console
 from rich.table import Table
 from rich import box
 from utils import calc_score_and_grade
+from heatmap import LineHeatmap
 from halstead import (
     calc_loc_metrics,
     calc_halstead_metrics,
+    calc_approximate_halstead_metrics,
     calc_keyword_frequency,
     calc_average_line_length,
+    ResourceLimitError,
 )
 
 console = Console()
 
+class Limits:
+    """
+    Per-file resource limits for pathological inputs.
+
+    When a limit is hit, the file is either skipped or analyzed with the
+    cheap approximate tokenizer, depending on on_limit. The approximate
+    tokenizer gets its own max_seconds window and the file is skipped if it
+    runs out of time as well.
+    """
+    def __init__(self, max_bytes=None, max_line_length=None, max_tokens=None, max_seconds=None,
+                 on_limit="approximate"):
+        self.max_bytes = max_bytes
+        self.max_line_length = max_line_length
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.on_limit = on_limit
+
 class Result:
     """
     An object to hold the analysis results.
     """
-    def __init__(self, loc_metrics, halstead_metrics, keyword_frequency, avg_line_length):
+    def __init__(self, loc_metrics, halstead_metrics, keyword_frequency, avg_line_length, content_hash=None,
+                 note=None, heatmap=None):
+        self.content_hash = content_hash
+        self.note = note
+        self.heatmap = heatmap
         self.loc_metrics = loc_metrics
         self.halstead_metrics = halstead_metrics
         self.keyword_frequency = keyword_frequency
@@ -51,6 +77,8 @@ class Result:
                     file.write(f"{key}: {value:.2f}\n" if isinstance(value, float) else f"{key}: {value}\n")
             file.write(f"\nAverage Line Length: {self.avg_line_length:.2f} characters\n")
             file.write(f"\nFinal Score: {self.score}/100\nGrade: {self.grade}\n")
+            if self.note:
+                file.write(f"\nNote: {self.note}\n")
 
     def write_to_csv(self, output_file):
         """
@@ -77,6 +105,8 @@ class Result:
             writer.writerow(["Average Line Length", self.avg_line_length])
             writer.writerow(["Final Score", self.score])
             writer.writerow(["Grade", self.grade])
+            if self.note:
+                writer.writerow(["Note", self.note])
 
     def print_to_console(self):
         """
@@ -102,14 +132,67 @@ class Result:
         console.print(f"[bold]Average Line Length:[/bold] [magenta]{self.avg_line_length:.2f} characters[/magenta]\n")
         console.print(f"[bold cyan underline]Final Score:[/bold cyan underline] [bright_cyan bold]{self.score}/100[/bright_cyan bold]")
         console.print(f"[bold magenta underline]Grade:[/bold magenta underline] [bright_magenta bold]{self.grade}[/bright_magenta bold]")
+        if self.note:
+            console.print(f"[yellow]Note: {self.note}[/yellow]")
 
-def combine_results_to_csv(results, output_path):
+class Skipped:
+    """
+    An object to hold the reason a file was skipped instead of analyzed.
+    """
+    def __init__(self, reason, content_hash=None):
+        self.reason = reason
+        self.content_hash = content_hash
+
+    def write_to_file(self, output_file):
+        """
+        Write the skip reason to a file.
+
+        Args:
+            output_file (str): The path to the output file.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w') as file:
+            file.write(f"Code Analysis Report\n\nSkipped: {self.reason}\n")
+
+    def write_to_csv(self, output_file):
+        """
+        Write the skip reason to a CSV file.
+
+        Args:
+            output_file (str): The path to the output file.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Section", "Metric", "Value"])
+            writer.writerow(["Results", "Skipped", self.reason])
+
+    def print_to_console(self):
+        """
+        Print the skip reason to the console.
+
+        Returns:
+            None
+        """
+        console.print(f"[yellow]Skipped: {self.reason}[/yellow]")
+
+def combine_results_to_csv(results, output_path, indices=None, shard=None):
     """
     Combine multiple analysis results into a single CSV file.
 
     Args:
-        results (list): List of tuples containing (filename, Result object)
+        results (list): List of tuples containing (filename, Result or Skipped object)
         output_path (str): Path to the output CSV file
+        indices (list): Input list index of each result, written as a leading
+            "Index" column so sharded runs can be merged (optional).
+        shard (str): The shard of a sharded run as 'i/N', written in a
+            "Shard" row after the header (used with indices).
     """
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
@@ -117,53 +200,127 @@ def combine_results_to_csv(results, output_path):
         writer = csv.writer(csvfile)
 
         # Write header row
-        writer.writerow(["Filename", "Section", "Metric", "Value"])
+        writer.writerow([*(["Index"] if indices is not None else []), "Filename", "Section", "Metric", "Value"])
+        if shard:
+            writer.writerow(["Shard", shard])
 
         # Write data for each file
-        for filename, result in results:
+        for position, (filename, result) in enumerate(results):
+            index_column = [indices[position]] if indices is not None else []
+
+            # Record why a file was skipped
+            if isinstance(result, Skipped):
+                writer.writerow([*index_column, filename, "Results", "Skipped", result.reason])
+                writer.writerow([])
+                continue
+
             # Add LOC metrics
             for key, value in result.loc_metrics.items():
-                writer.writerow([filename, "LOC Metrics", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
+                writer.writerow([*index_column, filename, "LOC Metrics", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
 
             # Add Halstead metrics
             for key, value in result.halstead_metrics.items():
-                writer.writerow([filename, "Halstead Metrics", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
+                writer.writerow([*index_column, filename, "Halstead Metrics", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
 
             # Add keyword frequency
             for key, value in result.keyword_frequency.items():
-                writer.writerow([filename, "Keyword Frequency", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
+                writer.writerow([*index_column, filename, "Keyword Frequency", key, f"{value:.2f}" if isinstance(value, float) else str(value)])
 
             # Add average line length
-            writer.writerow([filename, "General", "Average Line Length", f"{result.avg_line_length:.2f}"])
+            writer.writerow([*index_column, filename, "General", "Average Line Length", f"{result.avg_line_length:.2f}"])
 
             # Add score and grade
-            writer.writerow([filename, "Results", "Final Score", result.score])
-            writer.writerow([filename, "Results", "Grade", result.grade])
+            writer.writerow([*index_column, filename, "Results", "Final Score", result.score])
+            writer.writerow([*index_column, filename, "Results", "Grade", result.grade])
+            if result.note:
+                writer.writerow([*index_column, filename, "Results", "Note", result.note])
 
             # Add a blank row between files for better readability
             writer.writerow([])
 
-def analyze_code(file_path, output_file=None, csv=False, silent=False):
+def analyze_lines(lines, content_hash=None, limits=None, heatmap=False):
     """
-    Analyze the code in the given file and print or save the results.
+    Analyze the given code lines, honoring the resource limits.
 
     Args:
-        file_path (str): The path to the file to analyze.
-        output_file (str): The path to the output file (optional).
+        lines (list): List of code lines.
+        content_hash (str): Hash of the file contents (optional).
+        limits (Limits): Per-file resource limits (optional).
+        heatmap (bool): Collect per-line operator and operand counts during tokenization.
 
     Returns:
-        None
+        Result: The analysis result, or Skipped if a limit was hit in skip mode.
     """
-    with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
+    limits = limits or Limits()
+    deadline = time.monotonic() + limits.max_seconds if limits.max_seconds else None
 
-    result = Result(
+    reason = None
+    halstead_metrics = None
+    line_heatmap = LineHeatmap(lines) if heatmap else None
+    longest_line = max((len(line) for line in lines), default=0)
+    if limits.max_line_length and longest_line > limits.max_line_length:
+        reason = f"line length {longest_line} exceeds {limits.max_line_length}"
+    else:
+        try:
+            halstead_metrics = calc_halstead_metrics(lines, limits.max_tokens, deadline, line_heatmap)
+        except ResourceLimitError as e:
+            reason = str(e)
+
+    note = None
+    if reason:
+        if limits.on_limit == "skip":
+            return Skipped(reason, content_hash)
+        # The fallback gets its own max_seconds window, so a file is bounded by twice the limit
+        fallback_deadline = time.monotonic() + limits.max_seconds if limits.max_seconds else None
+        try:
+            halstead_metrics = calc_approximate_halstead_metrics(lines, fallback_deadline)
+        except ResourceLimitError as e:
+            return Skipped(f"{reason}; approximate fallback: {e}", content_hash)
+        line_heatmap = None
+        note = f"Approximate Halstead metrics ({reason})"
+
+    return Result(
         calc_loc_metrics(lines),
-        calc_halstead_metrics(lines),
+        halstead_metrics,
         calc_keyword_frequency(lines),
-        calc_average_line_length(lines)
+        calc_average_line_length(lines),
+        content_hash,
+        note,
+        line_heatmap
     )
 
+def analyze_code(file_path, output_file=None, csv=False, silent=False, cache=None, limits=None, heatmap=False):
+    """
+    Analyze the code in the given file and print or save the results.
+
+    Args:
+        file_path (str): The path to the file to analyze.
+        output_file (str): The path to the output file (optional).
+        cache (dict): Results keyed by content hash, shared across a batch so
+            identical files are only analyzed once (optional).
+        limits (Limits): Per-file resource limits (optional).
+        heatmap (bool): Collect per-line operator and operand counts (optional).
+
+    Returns:
+        Result: The analysis result, or Skipped if a limit was hit in skip mode.
+    """
+    size = os.path.getsize(file_path)
+    if limits and limits.max_bytes and size > limits.max_bytes:
+        # Too large to even read, so there is nothing to approximate
+        result = Skipped(f"file size {size} bytes exceeds {limits.max_bytes}")
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+
+        content_hash = hashlib.sha256("".join(lines).encode('utf-8')).hexdigest()
+
+        if cache is not None and content_hash in cache:
+            result = cache[content_hash]
+        else:
+            result = analyze_lines(lines, content_hash, limits, heatmap)
+            if cache is not None:
+                cache[content_hash] = result
+
     if output_file:
         if csv:
             result.write_to_csv(output_file)
@@ -15,6 +15,20 @@ def get_arguments():
         -il, --input-list: Path to a text file containing a list of input file paths.
         -ol, --output-list: Path to a text file containing a list of output file paths.
         -s, --silent: Suppress console output.
+        --shard: Only process shard i of N of the input list, balanced by file size.
+        --merge: Merge combined CSV files from sharded runs into --output.
+        --heatmap: Path to save line-level operator/operand heatmaps to (JSON or CSV).
+        --max-bytes: Skip files larger than this many bytes.
+        --max-line-length: Limit on the longest line of a file.
+        --max-tokens: Limit on the number of tokens in a file.
+        --max-seconds: Limit on the wall time spent tokenizing a file.
+        --on-limit: Skip the file or approximate its metrics when a limit is hit.
+        --db: Path to a SQLite database to store batch results in.
+        --run-id: Identifier for the batch run stored in the database.
+        --root: Directory to store and query database paths relative to.
+        -q, --query: Query the database for a metric trend or the top movers.
+        -m, --metric: Metric to query (e.g. 'Effort').
+        -n, --limit: Maximum number of rows returned by a query.
 
     Returns:
         args: The parsed command line arguments.
@@ -52,10 +66,92 @@ def get_arguments():
         type=str,
         help="Path to a text file containing a list of output file paths (used with --batch)."
     )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        metavar="I/N",
+        help="Only process shard I of N (1-based) of the input list, balanced by file size (used with --batch)."
+    )
+    parser.add_argument(
+        "--merge",
+        type=str,
+        nargs="+",
+        metavar="SHARD_CSV",
+        help="Merge combined CSV files from sharded runs into --output, in input list order."
+    )
     parser.add_argument(
         "-s", "--silent",
         action="store_true",
         help="Suppress console output."
     )
 
+    parser.add_argument(
+        "--heatmap",
+        type=str,
+        help="Path to save line-level operator/operand counts and token density to, as JSON or CSV (by extension)."
+    )
+
+    # Resource limits
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        help="Skip files larger than this many bytes."
+    )
+    parser.add_argument(
+        "--max-line-length",
+        type=int,
+        help="Limit on the longest line of a file, in characters."
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Limit on the number of tokens in a file."
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Limit on the wall time spent tokenizing a file, in seconds."
+    )
+    parser.add_argument(
+        "--on-limit",
+        choices=["approximate", "skip"],
+        default="approximate",
+        help="Skip the file or approximate its metrics when a limit is hit (default: approximate)."
+    )
+
+    # Results database
+    parser.add_argument(
+        "--db",
+        type=str,
+        help="Path to a SQLite database to store batch results in, or to query with --query."
+    )
+    parser.add_argument(
+        "--run-id",
+        type=str,
+        help="Identifier for the batch run stored in the database (generated if not provided)."
+    )
+    parser.add_argument(
+        "--root",
+        type=str,
+        help="Directory to store and query database paths relative to (default: absolute paths)."
+    )
+    parser.add_argument(
+        "-q", "--query",
+        choices=["trend", "movers"],
+        help="Query the database: 'trend' shows a metric over runs for --input, "
+             "'movers' shows the files whose metric changed most between the last two runs."
+    )
+    parser.add_argument(
+        "-m", "--metric",
+        type=str,
+        default="Effort",
+        help="Metric to query (default: Effort)."
+    )
+    parser.add_argument(
+        "-n", "--limit",
+        type=int,
+        default=20,
+        help="Maximum number of rows returned by a query (default: 20)."
+    )
+
     return parser.parse_args()
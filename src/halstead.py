@@ -4,7 +4,9 @@ Halstead Complexity Metrics Module
 
 import re
 import math
+import time
 
+from array import array
 from collections import Counter
 
 # Note:
@@ -71,6 +73,23 @@ OPERATORS = [
     *MULTI_WORD_OPERATORS
 ]
 
+# Set versions for O(1) membership tests per token/character
+OPERATOR_SET = frozenset(OPERATORS)
+KEYWORD_SET = frozenset(KEYWORDS)
+SYMBOL_CHARS = frozenset(''.join(SYMBOLS))
+MAX_SYMBOL_LENGTH = max(len(sym) for sym in SYMBOLS)
+
+COMMENT_OR_QUOTE = re.compile(r'["\']|' + re.escape(COMMENT))
+
+# How many characters or tokens to process between resource limit checks
+CHECK_INTERVAL = 4096
+APPROXIMATE_CHUNK_SIZE = 1 << 18
+
+class ResourceLimitError(Exception):
+    """
+    Raised when analyzing a file exceeds one of its resource limits.
+    """
+
 def calc_loc_metrics(lines: list) -> dict:
     """
     Calculate Line of Code (LOC) metrics.
@@ -94,33 +113,52 @@ def calc_loc_metrics(lines: list) -> dict:
         'Code Lines': code_lines
     }
 
-def tokenize_code(code_text):
+def tokenize_code(code_text, max_tokens=None, deadline=None, token_lines=None):
     """
     Tokenize code while preserving multi-character and multi-word operators.
+
+    Args:
+        code_text (str): The code to tokenize.
+        max_tokens (int): Maximum number of tokens before giving up (optional).
+        deadline (float): time.monotonic() value after which to give up (optional).
+        token_lines (array): If given, the 0-based line number of each token is appended to it.
+
+    Returns:
+        list: List of tokens.
+
+    Raises:
+        ResourceLimitError: If max_tokens or the deadline is exceeded.
     """
+    def check_deadline():
+        if deadline is not None and time.monotonic() > deadline:
+            raise ResourceLimitError("wall time limit exceeded")
+
     # Remove single-line comments (# to end of line)
     lines = code_text.split('\n')
     cleaned_lines = []
+    steps = 0
     for line in lines:
-        # Find # that's not inside a string
+        # Find # that's not inside a string, only visiting quotes and comment markers
         in_string = False
         quote_char = None
         comment_pos = None
 
-        for i, char in enumerate(line):
+        for match in COMMENT_OR_QUOTE.finditer(line):
+            steps += 1
+            if steps % CHECK_INTERVAL == 0:
+                check_deadline()
+
+            i = match.start()
+            char = match.group()
             if not in_string and char in ['"', "'"]:
                 in_string = True
                 quote_char = char
             elif in_string and char == quote_char and (i == 0 or line[i-1] != '\\'):
                 in_string = False
                 quote_char = None
-            elif not in_string:
-                if len(COMMENT) == 1 and char == COMMENT:
-                    comment_pos = i
-                    break
-                elif len(COMMENT) == 2 and i + 1 < len(line) and char + line[i+1] == COMMENT:
-                    comment_pos = i
-                    break
+            elif not in_string and char == COMMENT:
+                comment_pos = i
+                break
 
         if comment_pos is not None:
             cleaned_lines.append(line[:comment_pos])
@@ -130,22 +168,41 @@ def tokenize_code(code_text):
     code_text = '\n'.join(cleaned_lines)
 
     # Handle multi-word operators, but only outside of strings
-    temp_code = ""
+    temp_parts = []
     i = 0
     multi_word_map = {}
 
+    # Conservative token estimate for max_tokens: every word start is at least
+    # one token, and every MAX_SYMBOL_LENGTH symbol characters at least one more
+    word_starts = 0
+    symbol_chars = 0
+    in_word = False
+
+    def check_budget():
+        check_deadline()
+        if max_tokens is not None and word_starts + symbol_chars // MAX_SYMBOL_LENGTH > max_tokens:
+            raise ResourceLimitError(f"token count exceeds {max_tokens}")
+
     while i < len(code_text):
+        steps += 1
+        if steps % CHECK_INTERVAL == 0:
+            check_budget()
+
         # Check if we're starting a string
         if code_text[i] in ['"', "'", '`']:
             quote_char = code_text[i]
             # Find the end of the string
             j = i + 1
             while j < len(code_text):
+                steps += 1
+                if steps % CHECK_INTERVAL == 0:
+                    check_budget()
                 if code_text[j] == quote_char and (j == i + 1 or code_text[j-1] != '\\'):
                     break
                 j += 1
             # Add the entire string (including quotes) without modification
-            temp_code += code_text[i:j+1]
+            temp_parts.append(code_text[i:j+1])
+            in_word = False
             i = j + 1
         else:
             # Check for multi-word operators at this position
@@ -158,16 +215,29 @@ def tokenize_code(code_text):
 
                     if before_ok and after_ok:
                         placeholder = f"__MULTIWORD_{op_idx}__"
-                        temp_code += placeholder
+                        temp_parts.append(placeholder)
                         multi_word_map[placeholder] = op
+                        word_starts += 1
+                        in_word = False
                         i += len(op)
                         found_multiword = True
                         break
 
             if not found_multiword:
-                temp_code += code_text[i]
+                char = code_text[i]
+                if char.isalnum() or char == '_':
+                    word_starts += not in_word
+                    in_word = True
+                else:
+                    symbol_chars += char in SYMBOL_CHARS
+                    in_word = False
+                temp_parts.append(char)
                 i += 1
 
+    check_budget()
+
+    temp_code = "".join(temp_parts)
+
     # Sort symbols by length (longest first) to match multi-char operators first
     sorted_symbols = sorted(SYMBOLS, key=len, reverse=True)
 
@@ -188,11 +258,21 @@ def tokenize_code(code_text):
     else:
         pattern = f'[frbFRB]*"[^"]*"|[frbFRB]*\'[^\']*\'|`[^`]*`|{symbol_pattern}|{keyword_pattern}|{identifier_pattern}'
 
-    tokens = re.findall(pattern, temp_code)
-
     # Replace placeholders back with original multi-word operators
     final_tokens = []
-    for token in tokens:
+    line = 0
+    line_pos = 0
+    for match in re.finditer(pattern, temp_code):
+        token = match.group()
+        if token_lines is not None:
+            # Advance the line counter to the start of this token
+            line += temp_code.count('\n', line_pos, match.start())
+            line_pos = match.start()
+            token_lines.append(line)
+        if max_tokens is not None and len(final_tokens) >= max_tokens:
+            raise ResourceLimitError(f"token count exceeds {max_tokens}")
+        if len(final_tokens) % CHECK_INTERVAL == 0:
+            check_deadline()
         if token in multi_word_map:
             final_tokens.append(multi_word_map[token])
         else:
@@ -200,34 +280,99 @@ def tokenize_code(code_text):
 
     return final_tokens
 
-def calc_halstead_metrics(lines: list) -> dict:
+def calc_halstead_metrics(lines: list, max_tokens: int = None, deadline: float = None, heatmap=None) -> dict:
     """
     Calculate Halstead complexity metrics.
 
     Args:
         lines (list): List of code lines.
+        max_tokens (int): Maximum number of tokens before giving up (optional).
+        deadline (float): time.monotonic() value after which to give up (optional).
+        heatmap (LineHeatmap): If given, filled with per-line operator and operand counts.
+
+    Returns:
+        dict: Dictionary containing Halstead metrics.
+
+    Raises:
+        ResourceLimitError: If max_tokens or the deadline is exceeded.
+    """
+
+    code_text = " ".join(lines)
+    token_lines = array('I') if heatmap is not None else None
+    tokens = tokenize_code(code_text, max_tokens, deadline, token_lines)
+
+    if heatmap is not None:
+        for tok, line in zip(tokens, token_lines):
+            if tok in OPERATOR_SET:
+                heatmap.operators[line] += 1
+            else:
+                heatmap.operands[line] += 1
+
+    return halstead_from_tokens(tokens)
+
+def calc_approximate_halstead_metrics(lines: list, deadline: float = None) -> dict:
+    """
+    Calculate approximate Halstead complexity metrics in a single regex pass.
+
+    Comments and strings are not handled, so they are counted as operators
+    and operands, but the cost stays linear for pathological inputs.
+
+    Args:
+        lines (list): List of code lines.
+        deadline (float): time.monotonic() value after which to give up (optional).
 
     Returns:
         dict: Dictionary containing Halstead metrics.
+
+    Raises:
+        ResourceLimitError: If the deadline is exceeded.
     """
 
+    sorted_symbols = sorted(SYMBOLS, key=len, reverse=True)
+    pattern = re.compile('|'.join(re.escape(sym) for sym in sorted_symbols) + r'|\w+')
     code_text = " ".join(lines)
-    tokens = tokenize_code(code_text)
+
+    # Match in chunks cut at whitespace, checking the deadline between chunks
+    tokens = []
+    pos = 0
+    while pos < len(code_text):
+        if deadline is not None and time.monotonic() > deadline:
+            raise ResourceLimitError("wall time limit exceeded")
+        end = min(pos + APPROXIMATE_CHUNK_SIZE, len(code_text))
+        if end < len(code_text):
+            cut = max(code_text.rfind(' ', pos, end), code_text.rfind('\n', pos, end))
+            end = cut + 1 if cut > pos else end
+        tokens.extend(pattern.findall(code_text, pos, end))
+        pos = end
+
+    return halstead_from_tokens(tokens)
+
+def halstead_from_tokens(tokens: list) -> dict:
+    """
+    Calculate Halstead complexity metrics from a list of tokens.
+
+    Args:
+        tokens (list): List of tokens.
+
+    Returns:
+        dict: Dictionary containing Halstead metrics.
+    """
 
     # Halstead calculations
-    unique_operators = set(tok for tok in tokens if tok in OPERATORS)
-    unique_operands = set(tok for tok in tokens if tok not in OPERATORS)
+    operator_tokens = [tok for tok in tokens if tok in OPERATOR_SET]
+    unique_operators = set(operator_tokens)
+    unique_operands = set(tokens) - unique_operators
     n1 = len(unique_operators)
     n2 = len(unique_operands)
-    N1 = sum(1 for tok in tokens if tok in OPERATORS)
-    N2 = sum(1 for tok in tokens if tok not in OPERATORS)
+    N1 = len(operator_tokens)
+    N2 = len(tokens) - N1
 
     vocabulary = n1 + n2
     length = N1 + N2
     volume = length * math.log2(vocabulary) if vocabulary > 0 else 0
     difficulty = (n1 / 2) * (N2 / n2) if n2 > 0 else 0
     effort = difficulty * volume
-    time = effort / 18
+    time_required = effort / 18
     delivered_bugs = volume / 3000
 
     return {
@@ -240,7 +385,7 @@ def calc_halstead_metrics(lines: list) -> dict:
         'Volume': volume,
         'Difficulty': difficulty,
         'Effort': effort,
-        'Time': time,
+        'Time': time_required,
         'Delivered Bugs': delivered_bugs
     }
 
@@ -256,7 +401,7 @@ def calc_keyword_frequency(lines: list) -> dict:
     """
 
     tokens = re.findall(r'\b\w+\b', " ".join(lines))
-    keyword_counts = Counter(tok for tok in tokens if tok in KEYWORDS)
+    keyword_counts = Counter(tok for tok in tokens if tok in KEYWORD_SET)
 
     return keyword_counts or Counter({"None": 0})
 
@@ -0,0 +1,73 @@
+"""
+Heatmap module for line-level operator and operand counts.
+"""
+
+import csv
+import json
+import os
+from array import array
+
+class LineHeatmap:
+    """
+    An object to hold per-line operator and operand counts as integer arrays.
+    """
+    def __init__(self, lines):
+        self.lengths = array('I', (len(line.rstrip('\n')) for line in lines))
+        self.operators = array('I', [0]) * len(lines)
+        self.operands = array('I', [0]) * len(lines)
+
+    def density(self):
+        """
+        Calculate the token density (tokens per character) of each line.
+
+        Returns:
+            list: Token density per line.
+        """
+        return [
+            round((operators + operands) / length, 4) if length else 0.0
+            for operators, operands, length in zip(self.operators, self.operands, self.lengths)
+        ]
+
+    def to_dict(self):
+        """
+        Convert the heatmap to a dictionary of per-line columns.
+
+        Returns:
+            dict: Dictionary containing the per-line columns.
+        """
+        return {
+            'Operators': self.operators.tolist(),
+            'Operands': self.operands.tolist(),
+            'Density': self.density(),
+        }
+
+    def rows(self):
+        """
+        Get the heatmap as rows of (line, operators, operands, density), 1-based.
+
+        Returns:
+            list: List of row tuples.
+        """
+        return list(zip(range(1, len(self.lengths) + 1), self.operators, self.operands, self.density()))
+
+def combine_heatmaps(heatmaps, output_path):
+    """
+    Write line-level heatmaps to a single JSON or CSV file, based on its extension.
+
+    Args:
+        heatmaps (list): List of tuples containing (filename, LineHeatmap object)
+        output_path (str): Path to the output JSON or CSV file
+    """
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    if output_path.endswith(".csv"):
+        with open(output_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Filename", "Line", "Operators", "Operands", "Density"])
+            for filename, heatmap in heatmaps:
+                for row in heatmap.rows():
+                    writer.writerow([filename, *row])
+    else:
+        with open(output_path, 'w') as file:
+            json.dump({filename: heatmap.to_dict() for filename, heatmap in heatmaps}, file)
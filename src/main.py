@@ -4,23 +4,33 @@ Main module
 
 import os
 
+from datetime import datetime
+
 from rich.console import Console
+from rich.table import Table
+from rich import box
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import PathCompleter
 
 from app import get_arguments
 from analyzer import analyze_code
 from analyzer import combine_results_to_csv
+from analyzer import Limits, Skipped
+from store import save_results_to_db, query_trend, query_top_movers, run_exists
+from heatmap import combine_heatmaps
+from shard import parse_shard, partition_by_size, merge_shard_results
 
 console = Console()
 
-def handle_single_file_mode(input_path, output_path, silent=False):
+def handle_single_file_mode(input_path, output_path, silent=False, limits=None, heatmap_path=None):
     """
     Handle single file mode.
 
     Args:
         input_path (str): The path to the input file.
         output_path (str): The path to the output file.
+        limits (Limits): Per-file resource limits (optional).
+        heatmap_path (str): Path to save the line-level heatmap to, as JSON or CSV (optional).
 
     Returns:
         None
@@ -49,9 +59,29 @@ def handle_single_file_mode(input_path, output_path, silent=False):
     csv = output_path and output_path.endswith(".csv")
 
     # Call analyze_code with the specified files
-    analyze_code(input_path, output_path, csv, silent)
+    result = analyze_code(input_path, output_path, csv, silent, limits=limits, heatmap=bool(heatmap_path))
+
+    if heatmap_path:
+        save_heatmaps([(input_path, result)], heatmap_path)
 
-def handle_batch_mode(input_list_path, output_list_path=None, combined_output_path=None, silent=False):
+def save_heatmaps(results, heatmap_path):
+    """
+    Save the line-level heatmaps of the analyzed files.
+
+    Args:
+        results (list): List of tuples containing (input path, Result or Skipped object)
+        heatmap_path (str): Path to save the heatmaps to, as JSON or CSV.
+
+    Returns:
+        None
+    """
+    # Skipped and approximated files have no heatmap
+    heatmaps = [(path, result.heatmap) for path, result in results if getattr(result, "heatmap", None)]
+    combine_heatmaps(heatmaps, heatmap_path)
+    console.print(f"[green]Heatmap saved to {heatmap_path}[/green]")
+
+def handle_batch_mode(input_list_path, output_list_path=None, combined_output_path=None, silent=False,
+                      db_path=None, run_id=None, shard=None, limits=None, heatmap_path=None, root=None):
     """
     Handle batch mode for multiple input/output files.
 
@@ -59,6 +89,12 @@ def handle_batch_mode(input_list_path, output_list_path=None, combined_output_pa
         input_list_path (str): The path to the input list file.
         output_list_path (str): The path to the output list file.
         combined_output_path (str): Path to save combined results to a single file.
+        db_path (str): Path to a SQLite database to store the results in (optional).
+        run_id (str): Identifier for the run stored in the database (optional).
+        shard (str): Only process this shard of the input list, given as 'i/N' (optional).
+        limits (Limits): Per-file resource limits (optional).
+        heatmap_path (str): Path to save the line-level heatmaps to, as JSON or CSV (optional).
+        root (str): Directory to store paths in the database relative to (optional).
 
     Returns:
         None
@@ -72,12 +108,35 @@ def handle_batch_mode(input_list_path, output_list_path=None, combined_output_pa
     with open(input_list_path, "r") as file:
         input_files = [line.strip() for line in file.readlines() if line.strip()]
 
+    # Reject a reused run id before spending time on the analysis
+    if db_path and run_id and run_exists(db_path, run_id):
+        console.print(f"[red]Error: Run '{run_id}' already exists in {db_path}.[/red]")
+        exit(1)
+
+    # Select the input files for this shard, balanced by file size
+    selected = range(len(input_files))
+    if shard:
+        try:
+            shard_index, shard_count = parse_shard(shard)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            exit(1)
+        selected = partition_by_size(input_files, shard_count)[shard_index]
+
+    # Results keyed by input path, for the database sink
+    db_results = []
+
+    # Results keyed by content hash, so duplicate files are only analyzed once
+    cache = {}
+
     if combined_output_path:
         # Combined output mode
         all_results = []
+        all_indices = []
 
         # Process each input file and collect the results
-        for input_path in input_files:
+        for i in selected:
+            input_path = input_files[i]
             if not os.path.exists(input_path):
                 console.print(f"[yellow]Warning: Skipping '{input_path}' (file not found).[/yellow]")
                 continue
@@ -86,14 +145,24 @@ def handle_batch_mode(input_list_path, output_list_path=None, combined_output_pa
             filename = os.path.basename(input_path)
 
             # Analyze the file and get the result
-            result = analyze_code(input_path, None, False, silent)
+            result = analyze_code(input_path, None, False, silent, cache, limits, bool(heatmap_path))
             all_results.append((filename, result))
+            all_indices.append(i)
+            db_results.append((input_path, result))
 
             # Print status
-            console.print(f"Analyzed [cyan]{input_path}[/cyan]")
+            if isinstance(result, Skipped):
+                console.print(f"[yellow]Skipped [cyan]{input_path}[/cyan] ({result.reason})[/yellow]")
+            else:
+                console.print(f"Analyzed [cyan]{input_path}[/cyan]")
 
         # Save all results to a single CSV file
-        combine_results_to_csv(all_results, combined_output_path)
+        # Sharded runs record each file's input list index for the merge
+        if shard:
+            combine_results_to_csv(all_results, combined_output_path, all_indices,
+                                   f"{shard_index + 1}/{shard_count}")
+        else:
+            combine_results_to_csv(all_results, combined_output_path)
         console.print(f"[green]Combined results saved to {combined_output_path}[/green]")
 
     else:
@@ -114,7 +183,7 @@ def handle_batch_mode(input_list_path, output_list_path=None, combined_output_pa
             output_files = [None] * len(input_files)  # Output to console if no output list is provided
 
         # Process each input file
-        for input_path, output_path in zip(input_files, output_files):
+        for input_path, output_path in ((input_files[i], output_files[i]) for i in selected):
             if not os.path.exists(input_path):
                 console.print(f"[yellow]Warning: Skipping '{input_path}' (file not found).[/yellow]")
                 continue
@@ -125,20 +194,132 @@ def handle_batch_mode(input_list_path, output_list_path=None, combined_output_pa
             csv_output = output_path and output_path.endswith(".csv")
 
             # Call analyze_code with the specified files
-            analyze_code(input_path, output_path, csv_output, silent)
+            result = analyze_code(input_path, output_path, csv_output, silent, cache, limits, bool(heatmap_path))
+            db_results.append((input_path, result))
+
+    # Report how much work was saved by skipping duplicate contents
+    hashed = sum(1 for _, result in db_results if result.content_hash)
+    if hashed:
+        duplicates = hashed - len(cache)
+        console.print(f"Analyzed {len(cache)} unique of {hashed} files "
+                      f"({duplicates / hashed:.0%} duplicates)")
+
+    if heatmap_path:
+        save_heatmaps(db_results, heatmap_path)
+
+    if db_path:
+        # Skipped files have no metrics to store
+        db_results = [(path, result) for path, result in db_results if not isinstance(result, Skipped)]
+        try:
+            run_id = save_results_to_db(db_results, db_path, run_id, root)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            exit(1)
+        console.print(f"[green]Stored {len(db_results)} results in {db_path} (run {run_id})[/green]")
+
+def handle_merge_mode(shard_paths, output_path):
+    """
+    Handle merging combined CSV files from sharded batch runs.
+
+    Args:
+        shard_paths (list): The paths to the shard CSV files.
+        output_path (str): The path to the merged CSV file.
+
+    Returns:
+        None
+    """
+    for path in shard_paths:
+        if not os.path.exists(path):
+            console.print(f"[red]Error: The file '{path}' does not exist.[/red]")
+            exit(1)
+
+    try:
+        merge_shard_results(shard_paths, output_path)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        exit(1)
+
+    console.print(f"[green]Merged {len(shard_paths)} shards into {output_path}[/green]")
+
+def handle_query_mode(db_path, query, metric, input_path=None, limit=20, root=None):
+    """
+    Handle querying the results database.
+
+    Args:
+        db_path (str): The path to the SQLite database.
+        query (str): The query to run ('trend' or 'movers').
+        metric (str): The metric to query.
+        input_path (str): The file path to show the trend for (used with 'trend').
+        limit (int): Maximum number of rows to show.
+        root (str): Directory the paths were stored relative to (optional).
+
+    Returns:
+        None
+    """
+    if not os.path.exists(db_path):
+        console.print(f"[red]Error: The database '{db_path}' does not exist.[/red]")
+        exit(1)
+
+    try:
+        if query == "trend":
+            if not input_path:
+                console.print("[red]Error: --query trend requires --input.[/red]")
+                exit(1)
+            rows = query_trend(db_path, input_path, metric, limit, root)
+            table = Table(title=f"{metric} for {input_path}", box=box.SIMPLE)
+            table.add_column("Run", justify="left", style="cyan", no_wrap=True)
+            table.add_column("Date", justify="left")
+            table.add_column("Value", justify="right", style="magenta")
+            table.add_column("Note", justify="left", style="yellow")
+            for run_id, started_at, value, note in rows:
+                date = datetime.fromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S")
+                table.add_row(run_id, date, f"{value:.2f}" if isinstance(value, float) else str(value), note or "")
+        else:
+            rows = query_top_movers(db_path, metric, limit)
+            table = Table(title=f"Top movers by {metric}", box=box.SIMPLE)
+            table.add_column("File", justify="left", style="cyan", no_wrap=True)
+            table.add_column("Before", justify="right")
+            table.add_column("After", justify="right")
+            table.add_column("Change", justify="right", style="magenta")
+            for path, before, after, delta in rows:
+                table.add_row(path, *(f"{value:.2f}" if isinstance(value, float) else str(value)
+                                      for value in (before, after, delta)))
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        exit(1)
+
+    console.print(table)
 
 if __name__ == "__main__":
     args = get_arguments()
+    file_limits = Limits(args.max_bytes, args.max_line_length, args.max_tokens, args.max_seconds, args.on_limit)
+
+    if args.query:
+        if not args.db:
+            console.print("[red]Error: --query requires --db.[/red]")
+            exit(1)
+
+        handle_query_mode(args.db, args.query, args.metric, args.input, args.limit, args.root)
+    elif args.merge:
+        if not args.output:
+            console.print("[red]Error: --merge requires --output.[/red]")
+            exit(1)
 
-    if args.batch:
+        handle_merge_mode(args.merge, args.output)
+    elif args.batch:
         if not args.input_list:
             console.print("[red]Error: --batch mode requires --input-list.[/red]")
             exit(1)
 
         # Check if a single output file is specified with -o
         if args.output and not args.output_list:
-            handle_batch_mode(args.input_list, combined_output_path=args.output, silent=args.silent)
+            handle_batch_mode(args.input_list, combined_output_path=args.output, silent=args.silent,
+                              db_path=args.db, run_id=args.run_id, shard=args.shard, limits=file_limits,
+                              heatmap_path=args.heatmap, root=args.root)
         else:
-            handle_batch_mode(args.input_list, args.output_list, silent=args.silent)
+            handle_batch_mode(args.input_list, args.output_list, silent=args.silent,
+                              db_path=args.db, run_id=args.run_id, shard=args.shard, limits=file_limits,
+                              heatmap_path=args.heatmap, root=args.root)
     else:
-        handle_single_file_mode(args.input, args.output, silent=args.silent)
+        handle_single_file_mode(args.input, args.output, silent=args.silent, limits=file_limits,
+                                heatmap_path=args.heatmap)
@@ -0,0 +1,129 @@
+"""
+Shard module for splitting a batch across machines and merging the results.
+"""
+
+import csv
+import heapq
+import os
+
+def parse_shard(value):
+    """
+    Parse a shard specification of the form 'i/N' (1-based).
+
+    Args:
+        value (str): The shard specification.
+
+    Returns:
+        tuple: A tuple containing the shard index (0-based) and the shard count.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected the form i/N (e.g. 1/4)") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}', i must be between 1 and N")
+    return index - 1, count
+
+def partition_by_size(input_files, count):
+    """
+    Partition the input files into shards of similar total byte size.
+
+    Files are assigned largest first to the currently lightest shard, with
+    ties broken by list position, so every machine computes the same split.
+    Missing files count as empty.
+
+    Args:
+        input_files (list): List of input file paths.
+        count (int): The number of shards.
+
+    Returns:
+        list: One list of input file indices per shard, in input order.
+    """
+    sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in input_files]
+    order = sorted(range(len(input_files)), key=lambda i: (-sizes[i], i))
+
+    shards = [[] for _ in range(count)]
+    heap = [(0, shard) for shard in range(count)]
+    for i in order:
+        total, shard = heapq.heappop(heap)
+        shards[shard].append(i)
+        heapq.heappush(heap, (total + sizes[i], shard))
+
+    return [sorted(indices) for indices in shards]
+
+def read_shard_csv(path):
+    """
+    Read a combined results CSV file from a sharded run into per-file row blocks.
+
+    Args:
+        path (str): Path to the shard CSV file.
+
+    Returns:
+        tuple: A tuple containing the shard (0-based index, count) and a dict of
+            rows for each file (without the index column), keyed by input list index.
+
+    Raises:
+        ValueError: If the file was not written by a sharded run.
+    """
+    blocks = {}
+    with open(path, 'r', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        shard_row = next(reader, None)
+        if not header or header[0] != "Index" or not shard_row or shard_row[0] != "Shard":
+            raise ValueError(f"'{path}' is not a shard output (missing Index column or Shard row)")
+        shard = parse_shard(shard_row[1])
+        for row in reader:
+            if row:
+                blocks.setdefault(int(row[0]), []).append(row[1:])
+    return shard, blocks
+
+def merge_shard_results(shard_paths, output_path):
+    """
+    Merge combined CSV files from sharded runs into a single CSV file.
+
+    Each shard records its 'i/N' spec and the input list index of its files,
+    so the merge can check that all N shards are present and write the output
+    in input order, identical to an unsharded run.
+
+    Args:
+        shard_paths (list): Paths to the shard CSV files
+        output_path (str): Path to the output CSV file
+
+    Raises:
+        ValueError: If a shard file is malformed, a shard is missing or repeated,
+            or two shards contain the same file.
+    """
+    blocks_by_index = {}
+    seen_shards = set()
+    shard_count = None
+    for shard_path in shard_paths:
+        (index, count), blocks = read_shard_csv(shard_path)
+        if shard_count is not None and count != shard_count:
+            raise ValueError(f"Shard '{shard_path}' is from a {count}-shard run, expected {shard_count}")
+        if index in seen_shards:
+            raise ValueError(f"Shard {index + 1}/{count} is given more than once ('{shard_path}')")
+        shard_count = count
+        seen_shards.add(index)
+
+        for file_index, rows in blocks.items():
+            if file_index in blocks_by_index:
+                raise ValueError(f"Input list index {file_index} appears in more than one shard ('{shard_path}')")
+            blocks_by_index[file_index] = rows
+
+    missing = [f"{index + 1}/{shard_count}" for index in range(shard_count or 0) if index not in seen_shards]
+    if missing:
+        raise ValueError(f"Missing shards: {', '.join(missing)}")
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with open(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Filename", "Section", "Metric", "Value"])
+        for index in sorted(blocks_by_index):
+            writer.writerows(blocks_by_index[index])
+            writer.writerow([])
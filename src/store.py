@@ -0,0 +1,260 @@
+"""
+Store module for persisting batch results in a local SQLite database.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+# Typed result columns, keyed by the metric names used in the Result dictionaries
+METRIC_COLUMNS = {
+    'Total Lines': ('total_lines', 'INTEGER'),
+    'Blank Lines': ('blank_lines', 'INTEGER'),
+    'Comment Lines': ('comment_lines', 'INTEGER'),
+    'Code Lines': ('code_lines', 'INTEGER'),
+    'Unique Operators': ('unique_operators', 'INTEGER'),
+    'Unique Operands': ('unique_operands', 'INTEGER'),
+    'Total Operators': ('total_operators', 'INTEGER'),
+    'Total Operands': ('total_operands', 'INTEGER'),
+    'Vocabulary': ('vocabulary', 'INTEGER'),
+    'Program Length': ('program_length', 'INTEGER'),
+    'Volume': ('volume', 'REAL'),
+    'Difficulty': ('difficulty', 'REAL'),
+    'Effort': ('effort', 'REAL'),
+    'Time': ('time', 'REAL'),
+    'Delivered Bugs': ('delivered_bugs', 'REAL'),
+    'Average Line Length': ('avg_line_length', 'REAL'),
+    'Final Score': ('score', 'INTEGER'),
+}
+
+# Metrics that get a (run, metric) index for fast per-run ranking
+INDEXED_METRICS = ['Volume', 'Difficulty', 'Effort', 'Final Score']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL UNIQUE,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    content_hash TEXT,
+    {', '.join(f'{column} {kind}' for column, kind in METRIC_COLUMNS.values())},
+    grade TEXT,
+    keyword_frequency TEXT,
+    note TEXT,
+    PRIMARY KEY (run, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_results_path ON results (path, run);
+CREATE INDEX IF NOT EXISTS ix_results_hash ON results (content_hash);
+{''.join(
+    f'CREATE INDEX IF NOT EXISTS ix_results_{METRIC_COLUMNS[m][0]} ON results (run, {METRIC_COLUMNS[m][0]});'
+    for m in INDEXED_METRICS
+)}
+"""
+
+def connect(db_path):
+    """
+    Open the results database, creating the schema if needed.
+
+    Args:
+        db_path (str): The path to the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The open database connection.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def metric_column(metric):
+    """
+    Resolve a metric name (e.g. 'Effort' or 'effort') to its column name.
+
+    Args:
+        metric (str): The metric name.
+
+    Returns:
+        str: The column name.
+
+    Raises:
+        ValueError: If the metric is not stored in the database.
+    """
+    for name, (column, _) in METRIC_COLUMNS.items():
+        if metric in (name, column):
+            return column
+    raise ValueError(f"Unknown metric '{metric}'. Choose from: {', '.join(METRIC_COLUMNS)}")
+
+def normalize_path(path, root=None):
+    """
+    Normalize a file path for storing and querying.
+
+    Paths are made absolute, or relative to root when given, so the same file
+    matches regardless of the current directory or how it was listed.
+
+    Args:
+        path (str): The file path.
+        root (str): Directory to store paths relative to (optional).
+
+    Returns:
+        str: The normalized path, using forward slashes.
+    """
+    path = os.path.abspath(path)
+    if root:
+        path = os.path.relpath(path, os.path.abspath(root))
+    return path.replace(os.sep, '/')
+
+def run_exists(db_path, run_id):
+    """
+    Check whether a run with the given identifier is already stored.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        run_id (str): Identifier of the run
+
+    Returns:
+        bool: True if the run exists.
+    """
+    conn = connect(db_path)
+    try:
+        return conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+    finally:
+        conn.close()
+
+def _result_row(run, path, result):
+    """
+    Flatten a Result object into a row matching the results table.
+    """
+    metrics = {
+        **result.loc_metrics,
+        **result.halstead_metrics,
+        'Average Line Length': result.avg_line_length,
+        'Final Score': result.score,
+    }
+    return (
+        run,
+        path,
+        result.content_hash,
+        *(metrics[name] for name in METRIC_COLUMNS),
+        result.grade,
+        json.dumps(dict(result.keyword_frequency)),
+        result.note,
+    )
+
+def save_results_to_db(results, db_path, run_id=None, root=None):
+    """
+    Store a batch of analysis results as a single run.
+
+    All rows are bulk inserted inside one transaction.
+
+    Args:
+        results (list): List of tuples containing (path, Result object)
+        db_path (str): Path to the SQLite database file
+        run_id (str): Identifier of the run (generated if not provided)
+        root (str): Directory to store paths relative to (optional)
+
+    Returns:
+        str: The run identifier.
+
+    Raises:
+        ValueError: If a run with the same identifier is already stored.
+    """
+    run_id = run_id or uuid.uuid4().hex
+    columns = ['run', 'path', 'content_hash', *(c for c, _ in METRIC_COLUMNS.values()), 'grade', 'keyword_frequency',
+               'note']
+    insert = f"INSERT OR REPLACE INTO results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            if conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                raise ValueError(f"Run '{run_id}' already exists in {db_path}")
+            cursor = conn.execute("INSERT INTO runs (run_id, started_at) VALUES (?, ?)", (run_id, time.time()))
+            run = cursor.lastrowid
+            conn.executemany(insert, (_result_row(run, normalize_path(path, root), result) for path, result in results))
+    finally:
+        conn.close()
+
+    return run_id
+
+def query_trend(db_path, path, metric, limit=200, root=None):
+    """
+    Get the history of a metric for a single file, newest run first.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        path (str): The file path, normalized the same way as when stored
+        metric (str): The metric name
+        limit (int): Maximum number of runs to return
+        root (str): Directory the paths were stored relative to (optional)
+
+    Returns:
+        list: List of tuples containing (run_id, started_at, value, note), where note
+            is set when the value is approximate
+    """
+    column = metric_column(metric)
+    conn = connect(db_path)
+    try:
+        return conn.execute(
+            f"SELECT runs.run_id, runs.started_at, results.{column}, results.note "
+            "FROM results JOIN runs ON runs.id = results.run "
+            "WHERE results.path = ? ORDER BY results.run DESC LIMIT ?",
+            (normalize_path(path, root), limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+def query_top_movers(db_path, metric, limit=20, base_run_id=None, head_run_id=None):
+    """
+    Get the files whose metric changed the most between two runs.
+
+    Defaults to comparing the latest run against the one before it. Files
+    with approximate metrics in either run are excluded, since switching
+    between exact and approximate metrics is not a real change.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+        metric (str): The metric name
+        limit (int): Maximum number of files to return
+        base_run_id (str): The older run to compare against
+        head_run_id (str): The newer run to compare
+
+    Returns:
+        list: List of tuples containing (path, old value, new value, delta)
+    """
+    column = metric_column(metric)
+    conn = connect(db_path)
+    try:
+        def resolve(run_id):
+            row = conn.execute("SELECT id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown run '{run_id}'")
+            return row[0]
+
+        if head_run_id:
+            head = resolve(head_run_id)
+        else:
+            row = conn.execute("SELECT MAX(id) FROM runs").fetchone()
+            head = row[0]
+        if base_run_id:
+            base = resolve(base_run_id)
+        else:
+            row = conn.execute("SELECT MAX(id) FROM runs WHERE id < ?", (head,)).fetchone()
+            base = row[0]
+
+        if head is None or base is None:
+            return []
+
+        return conn.execute(
+            f"SELECT head.path, base.{column}, head.{column}, head.{column} - base.{column} AS delta "
+            "FROM results AS head JOIN results AS base ON base.run = ? AND base.path = head.path "
+            "WHERE head.run = ? AND head.note IS NULL AND base.note IS NULL "
+            "ORDER BY ABS(delta) DESC LIMIT ?",
+            (base, head, limit)
+        ).fetchall()
+    finally:
+        conn.close()
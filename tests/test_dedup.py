@@ -0,0 +1,67 @@
+"""
+Tests for analyzing identical file contents once per batch.
+"""
+
+import csv
+
+import pytest
+
+import analyzer
+from main import handle_batch_mode
+
+SHARED = "def f(a):\n    return a + 1\n"
+UNIQUE = "x = [i * 2 for i in range(10)]\n"
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """
+    Write two identical files and one unique file, and count analyze_lines calls.
+    """
+    sources = {"a/shared.py": SHARED, "b/shared.py": SHARED, "c/unique.py": UNIQUE}
+    input_files = []
+    for name, code in sources.items():
+        path = tmp_path / "src" / name
+        path.parent.mkdir(parents=True)
+        path.write_text(code)
+        input_files.append(str(path))
+
+    input_list = tmp_path / "inputs.txt"
+    input_list.write_text("\n".join(input_files))
+
+    calls = []
+    analyze_lines = analyzer.analyze_lines
+    def counting_analyze_lines(lines, *args, **kwargs):
+        calls.append("".join(lines))
+        return analyze_lines(lines, *args, **kwargs)
+    monkeypatch.setattr(analyzer, "analyze_lines", counting_analyze_lines)
+
+    return input_list, calls
+
+def test_combined_output_analyzes_shared_content_once(tmp_path, batch, capsys):
+    input_list, calls = batch
+    output = tmp_path / "out" / "combined.csv"
+
+    handle_batch_mode(str(input_list), combined_output_path=str(output), silent=True)
+
+    assert sorted(calls) == sorted([SHARED, UNIQUE])
+    assert "Analyzed 2 unique of 3 files (33% duplicates)" in capsys.readouterr().out
+
+    with open(output, newline='') as file:
+        rows = [row for row in csv.reader(file) if row][1:]
+    shared_rows = [row[1:] for row in rows if row[0] == "shared.py"]
+    assert len(shared_rows) % 2 == 0
+    half = len(shared_rows) // 2
+    assert shared_rows[:half] == shared_rows[half:]
+
+def test_output_list_gets_the_shared_result_for_every_path(tmp_path, batch, capsys):
+    input_list, calls = batch
+    outputs = [tmp_path / "out" / f"{name}.csv" for name in ["a", "b", "c"]]
+    output_list = tmp_path / "outputs.txt"
+    output_list.write_text("\n".join(str(path) for path in outputs))
+
+    handle_batch_mode(str(input_list), str(output_list), silent=True)
+
+    assert len(calls) == 2
+    assert "Analyzed 2 unique of 3 files" in capsys.readouterr().out
+    assert outputs[0].read_bytes() == outputs[1].read_bytes()
+    assert outputs[0].read_bytes() != outputs[2].read_bytes()
@@ -0,0 +1,89 @@
+"""
+Tests for the line-level heatmap.
+"""
+
+import csv
+import json
+
+from analyzer import Limits, analyze_lines
+from halstead import calc_halstead_metrics
+from heatmap import LineHeatmap, combine_heatmaps
+
+CODE = [
+    'x = "first\n',
+    'second"\n',
+    'y = 1  # z + z + z\n',
+    '# only a comment\n',
+    '\n',
+    'z\n',
+]
+
+def fill(lines):
+    heatmap = LineHeatmap(lines)
+    metrics = calc_halstead_metrics(lines, heatmap=heatmap)
+    return heatmap, metrics
+
+def test_multi_line_string_counts_on_its_first_line():
+    heatmap, _ = fill(CODE)
+
+    # x, = and the string on line 1, nothing left on line 2
+    assert list(heatmap.operators[:2]) == [1, 0]
+    assert list(heatmap.operands[:2]) == [2, 0]
+
+def test_comments_are_not_counted():
+    heatmap, _ = fill(CODE)
+
+    assert list(heatmap.operators[2:]) == [1, 0, 0, 0]
+    assert list(heatmap.operands[2:]) == [2, 0, 0, 1]
+
+def test_totals_match_file_metrics():
+    lines = [
+        "def is_odd(n):\n",
+        "    if n % 2 != 0 and n is not None:\n",
+        "        print(f\"{n} is odd.\")  # comment\n",
+        "    return n\n",
+    ]
+    heatmap, metrics = fill(lines)
+
+    assert sum(heatmap.operators) == metrics['Total Operators']
+    assert sum(heatmap.operands) == metrics['Total Operands']
+    assert len(heatmap.operators) == len(lines)
+
+def test_density():
+    heatmap, _ = fill(["a = b\n", "\n"])
+
+    assert heatmap.density() == [0.6, 0.0]
+
+def test_heatmap_is_only_kept_for_exact_results():
+    assert analyze_lines(CODE, heatmap=True).heatmap is not None
+    assert analyze_lines(CODE).heatmap is None
+
+    approximate = analyze_lines(CODE, limits=Limits(max_tokens=1), heatmap=True)
+    assert approximate.note is not None
+    assert approximate.heatmap is None
+
+def test_combine_heatmaps(tmp_path):
+    heatmap, _ = fill(CODE)
+    json_path = tmp_path / "out" / "heatmap.json"
+    csv_path = tmp_path / "out" / "heatmap.csv"
+
+    combine_heatmaps([("code.py", heatmap)], str(json_path))
+    combine_heatmaps([("code.py", heatmap)], str(csv_path))
+
+    data = json.loads(json_path.read_text())
+    assert data["code.py"]["Operators"] == [1, 0, 1, 0, 0, 0]
+    assert data["code.py"]["Operands"] == [2, 0, 2, 0, 0, 1]
+
+    with open(csv_path, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["Filename", "Line", "Operators", "Operands", "Density"]
+    assert rows[1][:4] == ["code.py", "1", "1", "2"]
+    assert len(rows) == len(CODE) + 1
+
+def test_combine_heatmaps_to_current_directory(tmp_path, monkeypatch):
+    heatmap, _ = fill(CODE)
+    monkeypatch.chdir(tmp_path)
+
+    combine_heatmaps([("code.py", heatmap)], "heatmap.json")
+
+    assert "code.py" in json.loads((tmp_path / "heatmap.json").read_text())
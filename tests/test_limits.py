@@ -0,0 +1,127 @@
+"""
+Tests for the per-file resource limits.
+"""
+
+import csv
+
+import pytest
+
+import halstead
+
+from analyzer import Limits, Result, Skipped, analyze_code, analyze_lines, combine_results_to_csv
+from halstead import ResourceLimitError, calc_approximate_halstead_metrics, tokenize_code
+
+CODE = [
+    "def is_odd(n):\n",
+    "    # Check the remainder\n",
+    "    if n % 2 != 0 and n is not None:\n",
+    "        print(f\"{n} is odd.\")\n",
+    "    return n\n",
+]
+
+# A minified-style single line, long enough to pass several limit checks
+MINIFIED = [";".join(f"a{i}=b{i}*{i}+'s'" for i in range(5000)) + "\n"]
+
+def write(tmp_path, lines, name="code.py"):
+    path = tmp_path / name
+    path.write_text("".join(lines))
+    return str(path)
+
+def test_limits_not_hit_match_unlimited_result():
+    limited = analyze_lines(CODE, limits=Limits(10**6, 10**6, 10**6, 60))
+    unlimited = analyze_lines(CODE)
+
+    assert limited.halstead_metrics == unlimited.halstead_metrics
+    assert limited.note is None
+
+def test_token_estimate_never_exceeds_real_count():
+    tokens = tokenize_code(" ".join(CODE))
+
+    assert tokenize_code(" ".join(CODE), max_tokens=len(tokens)) == tokens
+    with pytest.raises(ResourceLimitError):
+        tokenize_code(" ".join(CODE), max_tokens=len(tokens) - 1)
+
+def test_max_tokens_stops_inside_the_character_loops():
+    with pytest.raises(ResourceLimitError, match="token count exceeds 100"):
+        tokenize_code(" ".join(MINIFIED), max_tokens=100)
+
+def test_deadline_interrupts_a_single_long_line():
+    with pytest.raises(ResourceLimitError, match="wall time"):
+        tokenize_code(" ".join(MINIFIED), deadline=0)
+
+@pytest.mark.parametrize("limits, reason", [
+    (Limits(max_line_length=100), "line length"),
+    (Limits(max_tokens=100), "token count exceeds 100"),
+])
+def test_approximate_mode(limits, reason):
+    result = analyze_lines(MINIFIED, limits=limits)
+
+    assert isinstance(result, Result)
+    assert result.note.startswith("Approximate Halstead metrics")
+    assert reason in result.note
+    assert result.halstead_metrics == calc_approximate_halstead_metrics(MINIFIED)
+
+@pytest.mark.parametrize("limits, reason", [
+    (Limits(max_line_length=100, on_limit="skip"), "line length"),
+    (Limits(max_tokens=100, on_limit="skip"), "token count exceeds 100"),
+    (Limits(max_seconds=1e-9, on_limit="skip"), "wall time"),
+])
+def test_skip_mode(limits, reason):
+    result = analyze_lines(MINIFIED, "hash", limits)
+
+    assert isinstance(result, Skipped)
+    assert reason in result.reason
+    assert result.content_hash == "hash"
+
+def test_approximate_fallback_after_wall_time_limit(monkeypatch):
+    # Expire the exact tokenizer's deadline without touching the fallback's
+    def slow_tokenize(*args, **kwargs):
+        raise ResourceLimitError("wall time limit exceeded")
+    monkeypatch.setattr(halstead, "tokenize_code", slow_tokenize)
+
+    result = analyze_lines(MINIFIED, limits=Limits(max_seconds=60))
+
+    assert isinstance(result, Result)
+    assert result.note == "Approximate Halstead metrics (wall time limit exceeded)"
+
+def test_approximate_fallback_has_its_own_deadline():
+    result = analyze_lines(MINIFIED, limits=Limits(max_seconds=1e-9))
+
+    assert isinstance(result, Skipped)
+    assert "approximate fallback" in result.reason
+
+def test_max_bytes_skips_without_reading(tmp_path):
+    path = write(tmp_path, MINIFIED)
+
+    result = analyze_code(path, silent=True, limits=Limits(max_bytes=1000))
+
+    assert isinstance(result, Skipped)
+    assert "exceeds 1000" in result.reason
+    assert result.content_hash is None
+
+def read_csv(path):
+    with open(path, newline='') as file:
+        return list(csv.reader(file))
+
+def test_skipped_and_note_rows_in_combined_csv(tmp_path):
+    skipped = analyze_lines(MINIFIED, limits=Limits(max_tokens=100, on_limit="skip"))
+    approximate = analyze_lines(MINIFIED, limits=Limits(max_tokens=100))
+    output = str(tmp_path / "out" / "combined.csv")
+
+    combine_results_to_csv([("a.js", skipped), ("b.js", approximate)], output)
+    rows = read_csv(output)
+
+    assert rows[1] == ["a.js", "Results", "Skipped", skipped.reason]
+    assert rows[2] == []
+    assert ["b.js", "Results", "Note", approximate.note] in rows
+
+def test_skipped_and_note_rows_in_single_csv(tmp_path):
+    path = write(tmp_path, MINIFIED)
+    skipped_output = str(tmp_path / "out" / "skipped.csv")
+    approximate_output = str(tmp_path / "out" / "approximate.csv")
+
+    analyze_code(path, skipped_output, True, True, limits=Limits(max_line_length=100, on_limit="skip"))
+    analyze_code(path, approximate_output, True, True, limits=Limits(max_line_length=100))
+
+    assert read_csv(skipped_output)[-1][:2] == ["Results", "Skipped"]
+    assert read_csv(approximate_output)[-1][0] == "Note"
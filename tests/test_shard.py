@@ -0,0 +1,129 @@
+"""
+Tests for sharding batch runs and merging the shard outputs.
+"""
+
+import pytest
+
+from main import handle_batch_mode
+from shard import merge_shard_results, parse_shard, partition_by_size
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (0, 4)
+    assert parse_shard("4/4") == (3, 4)
+    for value in ["0/4", "5/4", "1/0", "a/b", "1", "1/2/3"]:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+def write_files(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"f{i}.py"
+        path.write_text("x" * size)
+        paths.append(str(path))
+    return paths
+
+def test_partition_covers_every_file_once(tmp_path):
+    paths = write_files(tmp_path, [10, 500, 20, 1000, 5, 300, 300])
+    shards = partition_by_size(paths + [str(tmp_path / "missing.py")], 3)
+
+    assert sorted(i for shard in shards for i in shard) == list(range(len(paths) + 1))
+    assert all(shard == sorted(shard) for shard in shards)
+
+def test_partition_is_deterministic(tmp_path):
+    paths = write_files(tmp_path, [7, 7, 7, 7, 100, 3])
+
+    assert partition_by_size(paths, 3) == partition_by_size(list(paths), 3)
+
+def test_partition_is_balanced(tmp_path):
+    sizes = [10000, 5000, 5000, 2500, 2500, 1000, 1000, 1000, 1000, 1, 2, 3]
+    paths = write_files(tmp_path, sizes)
+
+    totals = [sum(sizes[i] for i in shard) for shard in partition_by_size(paths, 3)]
+
+    # Greedy largest-first keeps the spread within the largest file size
+    assert max(totals) - min(totals) <= max(sizes)
+    assert max(totals) <= sum(sizes) / 3 + max(sizes)
+
+def test_merge_matches_unsharded_run(tmp_path):
+    sources = {
+        "a/index.py": "def f(a):\n    return a + 1\n",
+        "b/index.py": "import os\nprint(os.getcwd())\n",
+        "c/big.py": "x = [i * 2 for i in range(10)]\n" * 20,
+        "d/small.py": "y = 1\n",
+        "e/other.py": "if y is not None:\n    y -= 1\n",
+    }
+    input_files = []
+    for name, code in sources.items():
+        path = tmp_path / "src" / name
+        path.parent.mkdir(parents=True)
+        path.write_text(code)
+        input_files.append(str(path))
+    input_files.insert(2, str(tmp_path / "src" / "missing.py"))
+
+    input_list = tmp_path / "inputs.txt"
+    input_list.write_text("\n".join(input_files))
+
+    unsharded = tmp_path / "out" / "combined.csv"
+    handle_batch_mode(str(input_list), combined_output_path=str(unsharded), silent=True)
+
+    shard_paths = []
+    for i in range(1, 4):
+        shard_path = tmp_path / "out" / f"shard{i}.csv"
+        handle_batch_mode(str(input_list), combined_output_path=str(shard_path), silent=True, shard=f"{i}/3")
+        shard_paths.append(str(shard_path))
+
+    # Files changing size after the shard runs must not affect the merge
+    (tmp_path / "src" / "a" / "index.py").write_text("z = 0\n" * 1000)
+
+    merged = tmp_path / "out" / "merged.csv"
+    merge_shard_results(list(reversed(shard_paths)), str(merged))
+
+    assert merged.read_bytes() == unsharded.read_bytes()
+
+def write_shard(tmp_path, spec, index):
+    shard = tmp_path / f"shard{spec.replace('/', '_')}_{index}.csv"
+    shard.write_text(f"Index,Filename,Section,Metric,Value\nShard,{spec}\n{index},f.py,Results,Grade,A\n")
+    return str(shard)
+
+def test_merge_rejects_bad_shards(tmp_path):
+    unsharded = tmp_path / "combined.csv"
+    unsharded.write_text("Filename,Section,Metric,Value\nf.py,Results,Grade,A\n")
+    merged = str(tmp_path / "merged.csv")
+
+    with pytest.raises(ValueError, match="not a shard output"):
+        merge_shard_results([str(unsharded)], merged)
+    with pytest.raises(ValueError, match="more than once"):
+        merge_shard_results([write_shard(tmp_path, "1/2", 0), write_shard(tmp_path, "1/2", 1)], merged)
+    with pytest.raises(ValueError, match="more than one shard"):
+        merge_shard_results([write_shard(tmp_path, "1/2", 0), write_shard(tmp_path, "2/2", 0)], merged)
+    with pytest.raises(ValueError, match="3-shard run"):
+        merge_shard_results([write_shard(tmp_path, "1/2", 0), write_shard(tmp_path, "2/3", 1)], merged)
+
+def test_merge_rejects_missing_shards(tmp_path):
+    shards = [write_shard(tmp_path, "1/3", 0), write_shard(tmp_path, "3/3", 2)]
+
+    with pytest.raises(ValueError, match="Missing shards: 2/3"):
+        merge_shard_results(shards, str(tmp_path / "merged.csv"))
+
+def test_merge_to_current_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    merge_shard_results([write_shard(tmp_path, "1/1", 0)], "merged.csv")
+
+    assert (tmp_path / "merged.csv").read_text().startswith("Filename,")
+
+def test_merge_accepts_empty_shards(tmp_path):
+    paths = write_files(tmp_path, [10])
+    input_list = tmp_path / "inputs.txt"
+    input_list.write_text("\n".join(paths))
+
+    unsharded = tmp_path / "out" / "combined.csv"
+    handle_batch_mode(str(input_list), combined_output_path=str(unsharded), silent=True)
+    shards = []
+    for i in range(1, 4):
+        shards.append(str(tmp_path / "out" / f"shard{i}.csv"))
+        handle_batch_mode(str(input_list), combined_output_path=shards[-1], silent=True, shard=f"{i}/3")
+
+    merged = tmp_path / "out" / "merged.csv"
+    merge_shard_results(shards, str(merged))
+
+    assert merged.read_bytes() == unsharded.read_bytes()
@@ -0,0 +1,100 @@
+"""
+Tests for the results database store.
+"""
+
+import os
+
+import pytest
+
+from analyzer import analyze_lines
+from store import (
+    metric_column,
+    normalize_path,
+    query_top_movers,
+    query_trend,
+    run_exists,
+    save_results_to_db,
+)
+
+SMALL = ["x = 1\n"]
+LARGE = ["def f(a, b):\n", "    return a + b * 2 - a\n"]
+
+def make_result(lines, note=None):
+    result = analyze_lines(lines)
+    result.note = note
+    return result
+
+def test_metric_column():
+    assert metric_column("Effort") == "effort"
+    assert metric_column("score") == "score"
+    with pytest.raises(ValueError):
+        metric_column("bogus")
+
+def test_save_and_query_trend(tmp_path):
+    db = str(tmp_path / "results.db")
+    path = str(tmp_path / "f.py")
+
+    first = save_results_to_db([(path, make_result(SMALL))], db, "first")
+    second = save_results_to_db([(path, make_result(LARGE))], db, "second")
+
+    assert (first, second) == ("first", "second")
+    assert run_exists(db, "first")
+    assert not run_exists(db, "third")
+
+    rows = query_trend(db, path, "Effort")
+    assert [row[0] for row in rows] == ["second", "first"]
+    assert rows[0][2] == pytest.approx(make_result(LARGE).halstead_metrics['Effort'])
+    assert rows[1][3] is None
+
+    assert len(query_trend(db, path, "Effort", limit=1)) == 1
+
+def test_reused_run_id_is_rejected(tmp_path):
+    db = str(tmp_path / "results.db")
+    save_results_to_db([("a.py", make_result(SMALL))], db, "run")
+
+    with pytest.raises(ValueError):
+        save_results_to_db([("a.py", make_result(SMALL))], db, "run")
+
+def test_paths_are_normalized(tmp_path, monkeypatch):
+    db = str(tmp_path / "results.db")
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("src")
+
+    save_results_to_db([("src/./f.py", make_result(SMALL))], db, "abs")
+    save_results_to_db([("src/f.py", make_result(SMALL))], db, "rel", root=str(tmp_path))
+
+    assert [row[0] for row in query_trend(db, str(tmp_path / "src" / "f.py"), "Volume")] == ["abs"]
+    monkeypatch.chdir("src")
+    assert [row[0] for row in query_trend(db, "f.py", "Volume")] == ["abs"]
+    assert [row[0] for row in query_trend(db, "f.py", "Volume", root="..")] == ["rel"]
+    assert normalize_path("src/f.py", ".") == "src/f.py"
+
+def test_query_top_movers(tmp_path):
+    db = str(tmp_path / "results.db")
+    save_results_to_db([
+        ("same.py", make_result(SMALL)),
+        ("grew.py", make_result(SMALL)),
+        ("approx.py", make_result(SMALL)),
+    ], db, "base")
+    save_results_to_db([
+        ("same.py", make_result(SMALL)),
+        ("grew.py", make_result(LARGE)),
+        ("approx.py", make_result(LARGE, note="Approximate Halstead metrics")),
+    ], db, "head")
+
+    rows = query_top_movers(db, "Effort")
+    assert [os.path.basename(row[0]) for row in rows] == ["grew.py", "same.py"]
+    assert rows[0][3] == pytest.approx(rows[0][2] - rows[0][1])
+    assert rows[0][3] > 0
+    assert rows[1][3] == 0
+
+    assert len(query_top_movers(db, "Effort", limit=1)) == 1
+    assert query_top_movers(db, "Effort", base_run_id="head", head_run_id="head")[0][3] == 0
+    with pytest.raises(ValueError):
+        query_top_movers(db, "Effort", base_run_id="missing")
+
+def test_query_top_movers_single_run(tmp_path):
+    db = str(tmp_path / "results.db")
+    save_results_to_db([("a.py", make_result(SMALL))], db, "only")
+
+    assert query_top_movers(db, "Effort") == []